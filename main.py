@@ -1,4 +1,54 @@
+import argparse
+from pathlib import Path
+
+from src.config import N_SENTENCES
 from src.pipeline import run_extraction
+from src.sharding import parse_shard_spec
+
+
+def _shard_arg(spec: str):
+    # argparse only keeps the message of an ArgumentTypeError
+    try:
+        return parse_shard_spec(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
 
 if __name__ == "__main__":
-    run_extraction()
+    parser = argparse.ArgumentParser(description="Runs the extraction pipeline")
+    parser.add_argument(
+        "--max-sentences",
+        type=int,
+        default=None,
+        help=f"sentence cap, defaults to {N_SENTENCES} when neither --max-paragraphs nor --shard is given",
+    )
+    parser.add_argument(
+        "--max-paragraphs",
+        type=int,
+        default=None,
+        help="only read the first paragraphs of the dataset",
+    )
+    parser.add_argument("--out-dir", type=Path, default=None)
+    parser.add_argument(
+        "--shard",
+        type=_shard_arg,
+        default=None,
+        metavar="i/N",
+        help=(
+            "only process shard i (0-based) out of N, then run merge_shards.py ; "
+            "bound the run with --max-paragraphs : with --max-sentences every shard "
+            "parses up to the whole cap, so sharding gives no speedup"
+        ),
+    )
+    args = parser.parse_args()
+
+    max_sentences = args.max_sentences
+    if max_sentences is None and args.max_paragraphs is None and args.shard is None:
+        max_sentences = N_SENTENCES
+
+    run_extraction(
+        max_sentences=max_sentences,
+        out_dir=args.out_dir,
+        shard=args.shard,
+        max_paragraphs=args.max_paragraphs,
+    )
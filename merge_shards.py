@@ -0,0 +1,11 @@
+import argparse
+from pathlib import Path
+
+from src.pipeline import merge_shard_outputs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merges the outputs of main.py --shard runs")
+    parser.add_argument("--out-dir", type=Path, default=None)
+    args = parser.parse_args()
+
+    merge_shard_outputs(out_dir=args.out_dir)
@@ -0,0 +1,144 @@
+import os
+import time
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from .config import MAX_CHUNK_CHARS, BATCH_CHAR_BUDGET, BATCH_MAX_ITEMS, BATCH_WINDOW, BATCH_REPORT_EVERY
+
+_SENTENCE_ENDS = (". ", "! ", "? ")
+
+
+def _cut_position(text: str, start: int, max_chars: int) -> int:
+    """
+    end of the chunk starting at start : last line break, else last sentence end,
+    else last whitespace of the window, else a hard cut
+    """
+    end = start + max_chars
+    cut = text.rfind("\n", start + 1, end)
+    if cut == -1:
+        cut = max(text.rfind(s, start + 1, end - 1) for s in _SENTENCE_ENDS)
+        if cut != -1:
+            cut += 1  # keep the punctuation in the chunk
+    if cut == -1:
+        cut = max(text.rfind(" ", start + 1, end), text.rfind("\t", start + 1, end))
+    return end if cut == -1 else cut
+
+
+def chunk_text(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
+    """
+    splits a text longer than max_chars into consecutive chunks of at most max_chars,
+    cutting at safe boundaries (see _cut_position), the chunks joined back give the text
+    """
+    if len(text) <= max_chars:
+        return [text]
+    chunks: List[str] = []
+    start = 0
+    while len(text) - start > max_chars:
+        cut = _cut_position(text, start, max_chars)
+        chunks.append(text[start:cut])
+        start = cut
+    chunks.append(text[start:])
+    return chunks
+
+
+def _current_rss_mb() -> Optional[float]:
+    """resident memory of the process right now, None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _length_batches(texts: List[str], char_budget: int, max_items: int) -> List[List[int]]:
+    """
+    groups the positions of texts by increasing length into batches of about char_budget chars
+    and at most max_items texts, returned in the order of their first position
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_chars = 0
+    for pos in sorted(range(len(texts)), key=lambda p: len(texts[p])):
+        n_chars = len(texts[pos])
+        if current and (current_chars + n_chars > char_budget or len(current) >= max_items):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(pos)
+        current_chars += n_chars
+    if current:
+        batches.append(current)
+    # parsing the batch holding the earliest pending position first lets docs be released sooner
+    batches.sort(key=min)
+    return batches
+
+
+def pipe_by_length(
+        nlp,
+        items: Iterable[Tuple[str, Any]],
+        max_chunk_chars: int = MAX_CHUNK_CHARS,
+        char_budget: int = BATCH_CHAR_BUDGET,
+        max_items: int = BATCH_MAX_ITEMS,
+        window: int = BATCH_WINDOW,
+        report_every: int = BATCH_REPORT_EVERY,
+) -> Iterator[Tuple[Any, Any]]:
+    """
+    nlp.pipe replacement for (text, context) items of very uneven lengths
+
+    empty texts are skipped, texts longer than max_chunk_chars (or nlp.max_length) are
+    chunked, then inputs are buffered by windows of about window batches, sorted by length
+    and parsed in batches of about char_budget chars (at most max_items texts), so that each
+    batch costs about the same
+    yields (doc, context) in input order, one per chunk (chunks of a text are consecutive),
+    each doc as soon as all the earlier ones are parsed
+    per-batch latency and current RSS are printed every report_every batches
+    """
+    max_chars = min(max_chunk_chars, nlp.max_length)
+    window_chars = window * char_budget
+    window_items = window * max_items
+
+    n_batches = 0
+    total_secs = 0.0
+    max_secs = 0.0
+
+    def run_window(buffer: List[Tuple[str, Any]]) -> Iterator[Tuple[Any, Any]]:
+        nonlocal n_batches, total_secs, max_secs
+        texts = [text for text, _ in buffer]
+        docs: List[Any] = [None] * len(buffer)
+        next_pos = 0
+        for batch in _length_batches(texts, char_budget, max_items):
+            start = time.perf_counter()
+            batch_texts = [texts[pos] for pos in batch]
+            for pos, doc in zip(batch, nlp.pipe(batch_texts, batch_size=len(batch))):
+                docs[pos] = doc
+            secs = time.perf_counter() - start
+
+            n_batches += 1
+            total_secs += secs
+            max_secs = max(max_secs, secs)
+            if report_every and n_batches % report_every == 0:
+                n_chars = sum(len(t) for t in batch_texts)
+                rss = _current_rss_mb()
+                rss_str = f", RSS {rss:.0f} MB" if rss is not None else ""
+                print(
+                    f"  batch {n_batches}: {len(batch)} docs, {n_chars} chars, "
+                    f"{secs:.2f}s (mean {total_secs / n_batches:.2f}s, max {max_secs:.2f}s){rss_str}"
+                )
+
+            while next_pos < len(docs) and docs[next_pos] is not None:
+                yield docs[next_pos], buffer[next_pos][1]
+                docs[next_pos] = None
+                next_pos += 1
+
+    buffer: List[Tuple[str, Any]] = []
+    buffer_chars = 0
+    for text, ctx in items:
+        if not text.strip():
+            continue
+        for chunk in chunk_text(text, max_chars):
+            buffer.append((chunk, ctx))
+            buffer_chars += len(chunk)
+        if buffer_chars >= window_chars or len(buffer) >= window_items:
+            yield from run_window(buffer)
+            buffer, buffer_chars = [], 0
+    if buffer:
+        yield from run_window(buffer)
@@ -7,4 +7,10 @@ N_SENTENCES = 50_000
 DATASET_NAME = "Salesforce/wikitext"
 DATASET_CONFIG = "wikitext-103-raw-v1"
 
-SPACY_MODEL = "en_core_web_sm"
\ No newline at end of file
+SPACY_MODEL = "en_core_web_sm"
+# nlp.pipe batching of the dataset paragraphs
+MAX_CHUNK_CHARS = 10_000
+BATCH_CHAR_BUDGET = 100_000
+BATCH_MAX_ITEMS = 1000
+BATCH_WINDOW = 4  # batches buffered and sorted by length at once
+BATCH_REPORT_EVERY = 50
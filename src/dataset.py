@@ -1,8 +1,11 @@
-from typing import List
+from itertools import islice
+from typing import List, Optional, Tuple
 from datasets import load_dataset
 import spacy
 
 from .config import DATASET_NAME, DATASET_CONFIG, SPACY_MODEL
+from .batching import pipe_by_length
+from .sharding import make_sent_key
 
 
 def build_nlp(model: str = SPACY_MODEL):
@@ -10,10 +13,19 @@ def build_nlp(model: str = SPACY_MODEL):
     return spacy.load(model)
 
 
-def collect_sentences(max_sentences: int = 50_000, nlp=None) -> List[str]:
+def collect_keyed_sentences(
+        max_sentences: Optional[int] = 50_000,
+        nlp=None,
+        shard_index: int = 0,
+        n_shards: int = 1,
+        max_paragraphs: Optional[int] = None,
+) -> List[Tuple[str, str]]:
     """
-    collects sentences from the dataset
-    returns list of sentences (string)
+    collects sentences from the paragraphs of the dataset owned by a shard
+    (paragraph index modulo n_shards == shard_index), among the first max_paragraphs
+    paragraphs of the dataset, stopping after max_sentences sentences (None : no limit)
+    returns list of (sent_key, sentence), sent_key being "<paragraph>:<sentence>"
+    so that keys are unique across shards and sort in corpus order
     """
     if nlp is None:
         nlp = build_nlp()
@@ -21,13 +33,34 @@ def collect_sentences(max_sentences: int = 50_000, nlp=None) -> List[str]:
     ds = load_dataset(DATASET_NAME, DATASET_CONFIG)
     texts = ds["train"]["text"]
 
-    sentences: List[str] = []
-    for doc in nlp.pipe(texts, batch_size=1000):
+    owned = (
+        (text, para_id)
+        for para_id, text in enumerate(islice(texts, max_paragraphs))
+        if para_id % n_shards == shard_index
+    )
+
+    sentences: List[Tuple[str, str]] = []
+    current_para = None
+    sent_idx = 0
+    # long paragraphs come back as several consecutive docs
+    for doc, para_id in pipe_by_length(nlp, owned):
+        if para_id != current_para:
+            current_para, sent_idx = para_id, 0
         for sent in doc.sents:
             s = sent.text.strip()
             if not s:
                 continue
-            sentences.append(s)
-            if len(sentences) >= max_sentences:
+            sentences.append((make_sent_key(para_id, sent_idx), s))
+            sent_idx += 1
+            if max_sentences is not None and len(sentences) >= max_sentences:
                 return sentences
-    return sentences
\ No newline at end of file
+    return sentences
+
+
+def collect_sentences(max_sentences: int = 50_000, nlp=None) -> List[str]:
+    """
+    collects sentences from the dataset
+    returns list of sentences (string)
+    """
+    keyed = collect_keyed_sentences(max_sentences=max_sentences, nlp=nlp)
+    return [s for _, s in keyed]
@@ -1,6 +1,6 @@
 import csv
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Iterable, List, Sequence, Tuple
 
 
 def write_csv(path: Path, header: Sequence[str], rows: Iterable[Sequence[str]]) -> None:
@@ -13,3 +13,15 @@ def write_csv(path: Path, header: Sequence[str], rows: Iterable[Sequence[str]])
         writer.writerow(header)
         for row in rows:
             writer.writerow(row)
+
+
+def read_csv(path: Path) -> Tuple[List[str], List[List[str]]]:
+    """
+    Reads a semicolon separated csv file written by write_csv.
+    Returns (header, rows).
+    """
+    with path.open("r", newline="", encoding="utf-8") as f:
+        reader = list(csv.reader(f, delimiter=";"))
+    if not reader:
+        raise ValueError(f"Empty CSV: {path}")
+    return reader[0], reader[1:]
@@ -1,57 +1,142 @@
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Sequence, Tuple
 
 from .config import N_SENTENCES, DATA_DIR
-from .dataset import build_nlp, collect_sentences
-from .io_utils import write_csv
+from .dataset import build_nlp, collect_keyed_sentences
+from .io_utils import read_csv, write_csv
+from .sharding import (
+    MANIFEST_NAME,
+    SENTENCES_CSV,
+    build_id_map,
+    find_shard_dirs,
+    shard_dir,
+    write_manifest,
+)
 from .extractors.entities import extract_named_entities
 from .extractors.acronyms import extract_acronyms
 from .extractors.taxonomy import extract_is_a
 from .eval.sampling import sample_csv
 from .eval.evaluation import eval_precision_from_gold, evaluate_acronym_consistency
 
+ENTITIES_HEADER = ["sent_id", "entity", "label", "normalized", "sentence"]
+ACRONYMS_HEADER = ["sent_id", "acronym", "long_form", "sentence"]
+IS_A_HEADER = ["sent_id", "hyponym", "relation", "hypernym", "sentence"]
 
-def run_extraction(max_sentences: int = N_SENTENCES, out_dir: Optional[Path] = None) -> None:
+EXTRACTION_CSVS = (
+    ("entities.csv", ENTITIES_HEADER),
+    ("acronyms.csv", ACRONYMS_HEADER),
+    ("is_a_relations.csv", IS_A_HEADER),
+)
+
+
+def _assign_sent_ids(rows: List[tuple], sent_ids: Sequence) -> List[tuple]:
+    """replaces the per-call sentence index of extractor rows by the sentence's id"""
+    return [(sent_ids[row[0]],) + tuple(row[1:]) for row in rows]
+
+
+def run_extraction(
+        max_sentences: Optional[int] = N_SENTENCES,
+        out_dir: Optional[Path] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        max_paragraphs: Optional[int] = None,
+) -> None:
+    """
+    max_sentences / max_paragraphs limit the input, None meaning no limit
+
+    shard=(i, N) only processes the paragraphs owned by shard i and writes to
+    out_dir/shards/shard-00i-of-00N with global sentence keys as sent_id,
+    see merge_shard_outputs
+    a shard cannot know how many sentences the other shards have before its own,
+    so it applies the whole max_sentences to its own paragraphs : bound sharded runs
+    with max_paragraphs to actually split the work
+    """
     if out_dir is None:
         out_dir = DATA_DIR
+    shard_index, n_shards = shard if shard is not None else (0, 1)
+    run_dir = out_dir if shard is None else shard_dir(out_dir, shard_index, n_shards)
 
     print("Loading spaCy model...")
     nlp = build_nlp()
 
-    print(f"Collecting up to {max_sentences} sentences from the dataset...")
-    sentences = collect_sentences(max_sentences=max_sentences, nlp=nlp)
+    if shard is not None:
+        print(f"Running shard {shard_index}/{n_shards}, writing to {run_dir}")
+        # a rerun must not leave the shard looking complete while its csv files are rewritten
+        (run_dir / MANIFEST_NAME).unlink(missing_ok=True)
+    print(
+        f"Collecting sentences from the dataset "
+        f"(max sentences: {max_sentences}, max paragraphs: {max_paragraphs})..."
+    )
+    keyed = collect_keyed_sentences(
+        max_sentences=max_sentences,
+        nlp=nlp,
+        shard_index=shard_index,
+        n_shards=n_shards,
+        max_paragraphs=max_paragraphs,
+    )
+    sentences = [s for _, s in keyed]
+    sent_ids = [key for key, _ in keyed] if shard is not None else range(len(keyed))
     print(f"Collected {len(sentences)} sentences.")
 
     print("Extracting named entities...")
-    ent_rows = extract_named_entities(nlp, sentences)
-    ent_path = out_dir / "entities.csv"
-    write_csv(
-        ent_path,
-        ["sent_id", "entity", "label", "normalized", "sentence"],
-        ent_rows,
-    )
+    ent_rows = _assign_sent_ids(extract_named_entities(nlp, sentences), sent_ids)
+    ent_path = run_dir / "entities.csv"
+    write_csv(ent_path, ENTITIES_HEADER, ent_rows)
     print(f"Wrote {len(ent_rows)} entity rows to {ent_path}.")
 
     print("Extracting acronyms...")
-    acr_rows = extract_acronyms(nlp, sentences)
-    acr_path = out_dir / "acronyms.csv"
-    write_csv(
-        acr_path,
-        ["sent_id", "acronym", "long_form", "sentence"],
-        acr_rows,
-    )
+    acr_rows = _assign_sent_ids(extract_acronyms(nlp, sentences), sent_ids)
+    acr_path = run_dir / "acronyms.csv"
+    write_csv(acr_path, ACRONYMS_HEADER, acr_rows)
     print(f"Wrote {len(acr_rows)} acronym rows to {acr_path}.")
 
     print("Extracting IS_A relations...")
-    tax_rows = extract_is_a(nlp, sentences)
-    tax_path = out_dir / "is_a_relations.csv"
-    write_csv(
-        tax_path,
-        ["sent_id", "hyponym", "relation", "hypernym", "sentence"],
-        tax_rows,
-    )
+    tax_rows = _assign_sent_ids(extract_is_a(nlp, sentences), sent_ids)
+    tax_path = run_dir / "is_a_relations.csv"
+    write_csv(tax_path, IS_A_HEADER, tax_rows)
     print(f"Wrote {len(tax_rows)} IS_A relation rows to {tax_path}.")
 
+    if shard is not None:
+        # the merge needs every collected key, including sentences without any extraction
+        write_csv(run_dir / SENTENCES_CSV, ["sent_id", "sentence"], keyed)
+        write_manifest(
+            run_dir / MANIFEST_NAME, shard_index, n_shards, max_sentences, max_paragraphs, len(keyed)
+        )
+
+    print(f"All done. CSV files are in: {run_dir}")
+
+
+def merge_shard_outputs(out_dir: Optional[Path] = None) -> None:
+    """
+    merges the outputs of all the shards of out_dir/shards into out_dir,
+    producing the same csv files as a single-node run with the same limits :
+    sentences are put back in corpus order, cut to max_sentences and renumbered
+    """
+    if out_dir is None:
+        out_dir = DATA_DIR
+
+    dirs, max_sentences = find_shard_dirs(out_dir)
+    print(f"Merging {len(dirs)} shards from {out_dir}...")
+
+    keys: List[str] = []
+    for d in dirs:
+        _, rows = read_csv(d / SENTENCES_CSV)
+        keys.extend(row[0] for row in rows)
+    id_map = build_id_map(keys, max_sentences)
+    print(f"Kept {len(id_map)} sentences out of {len(keys)} collected.")
+
+    for name, header in EXTRACTION_CSVS:
+        merged: List[List] = []
+        for d in dirs:
+            shard_header, rows = read_csv(d / name)
+            if shard_header != header:
+                raise ValueError(f"Unexpected header in {d / name}: {shard_header}")
+            merged.extend([id_map[row[0]]] + row[1:] for row in rows if row[0] in id_map)
+        # stable sort : rows of a same sentence keep their extraction order
+        merged.sort(key=lambda row: row[0])
+        path = out_dir / name
+        write_csv(path, header, merged)
+        print(f"Wrote {len(merged)} rows to {path}.")
+
     print(f"All done. CSV files are in: {out_dir}")
 
 
@@ -0,0 +1,106 @@
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SHARDS_DIRNAME = "shards"
+MANIFEST_NAME = "shard.json"
+SENTENCES_CSV = "sentences.csv"
+
+
+def parse_shard_spec(spec: str) -> Tuple[int, int]:
+    """
+    parses a "i/N" shard spec (0-based index i out of N shards)
+    returns (i, N)
+    """
+    try:
+        index_str, count_str = spec.split("/")
+        index, count = int(index_str), int(count_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard spec {spec!r}, expected 'i/N'") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard spec {spec!r}, need 0 <= i < N")
+    return index, count
+
+
+def make_sent_key(para_id: int, sent_idx: int) -> str:
+    """global sentence key : paragraph index in the dataset + sentence index in the paragraph"""
+    return f"{para_id}:{sent_idx}"
+
+
+def parse_sent_key(key: str) -> Tuple[int, int]:
+    """inverse of make_sent_key, usable as a sort key (corpus order)"""
+    para_id, sent_idx = key.split(":")
+    return int(para_id), int(sent_idx)
+
+
+def shard_dir(out_dir: Path, shard_index: int, n_shards: int) -> Path:
+    return out_dir / SHARDS_DIRNAME / f"shard-{shard_index:03d}-of-{n_shards:03d}"
+
+
+def write_manifest(
+        path: Path,
+        shard_index: int,
+        n_shards: int,
+        max_sentences: Optional[int],
+        max_paragraphs: Optional[int],
+        n_collected: int,
+) -> None:
+    """
+    written last by a shard run, so that its presence means the shard is complete
+    """
+    manifest = {
+        "shard_index": shard_index,
+        "n_shards": n_shards,
+        "max_sentences": max_sentences,
+        "max_paragraphs": max_paragraphs,
+        "n_collected": n_collected,
+    }
+    path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def _run_settings(manifest: dict) -> Tuple[int, Optional[int], Optional[int]]:
+    return manifest["n_shards"], manifest["max_sentences"], manifest["max_paragraphs"]
+
+
+def find_shard_dirs(out_dir: Path) -> Tuple[List[Path], Optional[int]]:
+    """
+    finds the completed shard directories of out_dir and checks that they form
+    one complete run (same N, same limits, every index present once)
+    returns (shard dirs sorted by index, max_sentences)
+    """
+    manifests: Dict[int, Tuple[Path, dict]] = {}
+    for path in sorted((out_dir / SHARDS_DIRNAME).glob(f"*/{MANIFEST_NAME}")):
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        index = manifest["shard_index"]
+        if path.parent != shard_dir(out_dir, index, manifest["n_shards"]):
+            raise ValueError(f"{path} does not match the name of its directory")
+        if index in manifests:
+            raise ValueError(
+                f"Shard {index} found in both {manifests[index][0]} and {path.parent}, "
+                f"remove the directories of the stale run"
+            )
+        manifests[index] = (path.parent, manifest)
+
+    if not manifests:
+        raise ValueError(f"No completed shard found in {out_dir / SHARDS_DIRNAME}")
+
+    first = next(iter(manifests.values()))[1]
+    n_shards, max_sentences = first["n_shards"], first["max_sentences"]
+    for _, manifest in manifests.values():
+        if _run_settings(manifest) != _run_settings(first):
+            raise ValueError(f"Shards in {out_dir / SHARDS_DIRNAME} come from different runs")
+
+    missing = sorted(set(range(n_shards)) - set(manifests))
+    if missing:
+        raise ValueError(f"Missing shards {missing} out of {n_shards}")
+
+    return [manifests[i][0] for i in range(n_shards)], max_sentences
+
+
+def build_id_map(keys: Iterable[str], max_sentences: Optional[int]) -> Dict[str, int]:
+    """
+    keeps the first max_sentences keys (all if None) in corpus order and numbers them 0..n-1,
+    the same sent_id a single-node run gives to those sentences
+    """
+    ordered = sorted(keys, key=parse_sent_key)[:max_sentences]
+    return {key: sent_id for sent_id, key in enumerate(ordered)}